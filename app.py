@@ -1,13 +1,21 @@
 import os # Make sure this is at the top of your app.py
+import json
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from types import SimpleNamespace
 
-from flask import Flask, render_template, request, redirect, url_for, flash, make_response, current_app
+from flask import Flask, render_template, request, redirect, url_for, flash, send_file, jsonify, current_app
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timedelta
-import pdfkit
+from datetime import datetime, timedelta, MAXYEAR
 from calendar import monthrange
 from sqlalchemy import inspect # Import inspect for checking table existence
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, defer
+from pdf_backends import create_pdf_backend
+from assets import AssetPipeline
 
 
 # For Flask-Bootstrap
@@ -30,6 +38,12 @@ login_manager.init_app(app)
 login_manager.login_view = 'login'
 bootstrap = Bootstrap(app)
 
+# Fingerprinted, pre-compressed /static files and compressed HTML responses (see assets.py).
+# Set ASSETS_FINGERPRINT=0 while editing CSS/JS locally, since fingerprints are taken at startup.
+app.config['ASSETS_FINGERPRINT'] = os.environ.get('ASSETS_FINGERPRINT', '1') != '0'
+app.config['COMPRESS_HTML'] = os.environ.get('COMPRESS_HTML', '1') != '0'
+assets = AssetPipeline(app)
+
 # --- NEW: PDFKit Configuration ---
 # IMPORTANT: Adjust this path to where wkhtmltopdf.exe is located on your system.
 # The installer usually puts it in 'C:\Program Files\wkhtmltopdf\bin\' on Windows.
@@ -44,20 +58,75 @@ if WKHTMLTOPDF_PATH is None:
         if not os.path.exists(WKHTMLTOPDF_PATH):
             WKHTMLTOPDF_PATH = '/usr/bin/wkhtmltopdf'
 
-if WKHTMLTOPDF_PATH and not os.path.exists(WKHTMLTOPDF_PATH):
-    print(f"WARNING: wkhtmltopdf not found at '{WKHTMLTOPDF_PATH}'. PDF generation might fail.")
-    print("Please install wkhtmltopdf and/or configure WKHTMLTOPDF_PATH in app.py or as an environment variable.")
-    config = None # Set config to None if wkhtmltopdf is not found
-else:
-    # Only create configuration if WKHTMLTOPDF_PATH is not None and exists
-    if WKHTMLTOPDF_PATH:
-        config = pdfkit.configuration(wkhtmltopdf=WKHTMLTOPDF_PATH)
-        print(f"wkhtmltopdf configured at: {WKHTMLTOPDF_PATH}")
-    else: # This case handles when WKHTMLTOPDF_PATH is None (e.g., if it's in system PATH on some OS)
-        print("wkhtmltopdf path not explicitly set, trying to use system PATH.")
-        config = None # Let pdfkit try to find it in PATH
+# PDF backend: 'wkhtmltopdf' (one process per PDF), 'wkhtmltopdf_pool' (warm process pool)
+# or 'reportlab' (pure Python, no wkhtmltopdf needed; requires the reportlab package from
+# requirements.txt). See pdf_backends.py.
+app.config['PDF_BACKEND'] = os.environ.get('PDF_BACKEND', 'wkhtmltopdf')
+app.config['PDF_POOL_SIZE'] = int(os.environ.get('PDF_POOL_SIZE', 2))
+app.config['PDF_RENDER_TIMEOUT'] = float(os.environ.get('PDF_RENDER_TIMEOUT', 60)) # Seconds before a pooled wkhtmltopdf job is killed
+
+try:
+    pdf_backend = create_pdf_backend(app.config['PDF_BACKEND'],
+                                     wkhtmltopdf_path=WKHTMLTOPDF_PATH,
+                                     pool_size=app.config['PDF_POOL_SIZE'],
+                                     render_timeout=app.config['PDF_RENDER_TIMEOUT'])
+    print(f"PDF backend configured: {pdf_backend.name}")
+except RuntimeError as e:
+    print(f"WARNING: {e}. PDF generation might fail.")
+    print("Please install wkhtmltopdf and/or configure WKHTMLTOPDF_PATH, or set PDF_BACKEND=reportlab.")
+    pdf_backend = None # PDF routes will flash an error instead of crashing
 # --- END NEW: PDFKit Configuration ---
 
+# --- Password Hashing ---
+# PASSWORD_HASH_METHOD is any method werkzeug's generate_password_hash accepts,
+# e.g. 'pbkdf2:sha256:600000' or 'scrypt:32768:8:1'. Hashes made with other
+# settings are upgraded the next time that user logs in.
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
+# Hashing runs on a fixed pool of threads (hashlib releases the GIL), so a burst of
+# logins at shift start uses at most PASSWORD_HASH_WORKERS cores (half of them by default,
+# leaving the rest for other requests). Up to PASSWORD_HASH_QUEUE more logins queue for
+# at most PASSWORD_HASH_TIMEOUT seconds; any beyond that are turned away immediately.
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+app.config['PASSWORD_HASH_QUEUE'] = int(os.environ.get('PASSWORD_HASH_QUEUE', 32))
+app.config['PASSWORD_HASH_TIMEOUT'] = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+
+# The 'method$' prefix werkzeug writes for the configured settings, e.g. 'pbkdf2:sha256:1000000'
+PASSWORD_HASH_PREFIX = generate_password_hash('', method=app.config['PASSWORD_HASH_METHOD']).split('$', 1)[0]
+
+_password_hash_pool = ThreadPoolExecutor(max_workers=app.config['PASSWORD_HASH_WORKERS'],
+                                         thread_name_prefix='password-hash')
+_password_hash_slots = threading.BoundedSemaphore(app.config['PASSWORD_HASH_WORKERS'] + app.config['PASSWORD_HASH_QUEUE'])
+
+class PasswordHashBusy(Exception):
+    """Raised when every password hashing worker and queue slot is taken,
+    or a queued hash doesn't finish within PASSWORD_HASH_TIMEOUT seconds."""
+
+def _run_password_hash(func, *args):
+    # Don't wait for a slot: with every worker and queue slot taken, turn the caller away now
+    if not _password_hash_slots.acquire(blocking=False):
+        raise PasswordHashBusy()
+    try:
+        future = _password_hash_pool.submit(func, *args)
+    except Exception:
+        _password_hash_slots.release()
+        raise
+    # The slot is held until the hash actually finishes, even if the caller gives up on it
+    future.add_done_callback(lambda _: _password_hash_slots.release())
+    try:
+        return future.result(timeout=app.config['PASSWORD_HASH_TIMEOUT'])
+    except FutureTimeoutError:
+        future.cancel() # Drops it if it is still queued
+        raise PasswordHashBusy()
+
+def hash_password(password):
+    return _run_password_hash(generate_password_hash, password, app.config['PASSWORD_HASH_METHOD'])
+
+def verify_password(password_hash, password):
+    return _run_password_hash(check_password_hash, password_hash, password)
+
+def password_needs_rehash(password_hash):
+    return password_hash.split('$', 1)[0] != PASSWORD_HASH_PREFIX
+
 # --- Franchisee Model Definition ---
 # Moved here to ensure it's defined before it's used in load_user or other parts of the app
 class Franchisee(db.Model, UserMixin):
@@ -72,15 +141,19 @@ class Franchisee(db.Model, UserMixin):
     daily_reports = db.relationship('DailyReport', backref='franchisee', lazy=True, cascade="all, delete-orphan")
     ingredient_reorders = db.relationship('IngredientReorder', backref='franchisee', lazy=True, cascade="all, delete-orphan")
     team_attendances = db.relationship('TeamAttendance', backref='franchisee_member', lazy=True, cascade="all, delete-orphan")
+    sync_operations = db.relationship('SyncOperation', backref='franchisee', lazy=True, cascade="all, delete-orphan")
 
     def get_id(self):
         return str(self.id)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password, method='pbkdf2:sha256') # Ensure hashing method is specified
+        self.password_hash = hash_password(password) # Uses PASSWORD_HASH_METHOD
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return password_needs_rehash(self.password_hash)
 
     def __repr__(self):
         return f'<Franchisee {self.username}>'
@@ -124,6 +197,40 @@ class IngredientReorder(db.Model):
     def __repr__(self):
         return f'<IngredientReorder {self.ingredient_name} - {self.quantity_needed} - {self.status}>'
 
+class SyncOperation(db.Model):
+    # One row per operation applied through /api/sync, keyed by the booth's own idempotency key.
+    # The unique constraint doubles as the index used to spot replays in a single query.
+    id = db.Column(db.Integer, primary_key=True)
+    franchisee_id = db.Column(db.Integer, db.ForeignKey('franchisee.id'), nullable=False)
+    idempotency_key = db.Column(db.String(64), nullable=False)
+    operation_type = db.Column(db.String(20), nullable=False)
+    result_id = db.Column(db.Integer, nullable=True) # id of the DailyReport/TeamAttendance/IngredientReorder created
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('franchisee_id', 'idempotency_key', name='uq_sync_operation_key'),)
+
+    def __repr__(self):
+        return f'<SyncOperation {self.operation_type} - {self.idempotency_key}>'
+
+class MonthClose(db.Model):
+    # A closed month: headline totals as columns plus the full frozen monthly
+    # report as a JSON blob, so closed months are served without touching DailyReport.
+    id = db.Column(db.Integer, primary_key=True)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    closed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    closed_by = db.Column(db.String(64), nullable=True) # Username of the admin who closed it
+    report_count = db.Column(db.Integer, nullable=False, default=0)
+    total_sales = db.Column(db.Float, nullable=False, default=0.0)
+    total_expenses = db.Column(db.Float, nullable=False, default=0.0)
+    cash_discrepancy = db.Column(db.Float, nullable=False, default=0.0) # cash collected minus banked in
+    snapshot = db.Column(db.Text, nullable=False) # JSON produced by build_month_snapshot()
+
+    __table_args__ = (db.UniqueConstraint('year', 'month', name='uq_month_close_year_month'),)
+
+    def __repr__(self):
+        return f'<MonthClose {self.year}-{self.month:02d}>'
+
 # --- User Loader for Flask-Login ---
 @login_manager.user_loader
 def load_user(user_id):
@@ -157,7 +264,11 @@ def register():
             return redirect(url_for('register'))
 
         new_franchisee = Franchisee(username=username, name=name, location=location)
-        new_franchisee.set_password(password)
+        try:
+            new_franchisee.set_password(password)
+        except PasswordHashBusy:
+            flash('The server is busy right now. Please try again in a moment.', 'warning')
+            return redirect(url_for('register'))
 
         try:
             db.session.add(new_franchisee)
@@ -182,7 +293,23 @@ def login():
 
         franchisee = Franchisee.query.filter_by(username=username).first()
 
-        if franchisee and franchisee.check_password(password):
+        try:
+            password_ok = franchisee is not None and franchisee.check_password(password)
+        except PasswordHashBusy:
+            flash('Too many logins at once. Please try again in a moment.', 'warning')
+            return render_template('login.html', title='Login'), 503
+
+        if password_ok:
+            if franchisee.password_needs_rehash():
+                # Hashed with older settings: upgrade now while we have the plain password
+                try:
+                    franchisee.set_password(password)
+                    db.session.commit()
+                except PasswordHashBusy:
+                    pass # Try again next login
+                except Exception:
+                    db.session.rollback()
+                    current_app.logger.exception(f"Could not rehash password for '{franchisee.username}'.")
             login_user(franchisee)
             flash('Logged in successfully!', 'success')
             next_page = request.args.get('next')
@@ -227,6 +354,10 @@ def submit_daily_report():
                 flash(f'A daily report for {report_date_str} already exists. Please update it if needed.', 'warning')
                 return redirect(url_for('submit_daily_report'))
 
+            if is_month_closed(report_date):
+                flash(f'{report_date.strftime("%B %Y")} has been closed. Please contact an admin to add a report for {report_date_str}.', 'warning')
+                return redirect(url_for('submit_daily_report'))
+
             new_report = DailyReport(
                 franchisee_id=current_user.id,
                 report_date=report_date,
@@ -345,6 +476,229 @@ def my_daily_reports():
     reports = DailyReport.query.filter_by(franchisee_id=current_user.id).order_by(DailyReport.report_date.desc()).all()
     return render_template('my_daily_reports.html', title='My Daily Reports', reports=reports)
 
+# --- Offline Batch Sync API (for booths with flaky connectivity) ---
+# Booths queue daily reports, attendance rows and reorders while offline and
+# POST them here in one go once they reconnect:
+#   {"operations": [{"key": "<client-generated id>", "type": "daily_report", "data": {...}}, ...]}
+# Every operation gets a result in the same order. Replaying a key that was
+# already applied returns "duplicate" instead of creating it again.
+app.config['SYNC_MAX_BATCH'] = int(os.environ.get('SYNC_MAX_BATCH', 500))
+SYNC_KEY_MAX_LENGTH = 64
+SYNC_MAX_QUANTITY = 2**31 - 1 # Largest value an Integer column holds on Postgres
+
+def _sync_amount(data, field, default=None):
+    value = data[field] if default is None else data.get(field, default)
+    if isinstance(value, bool): # float(True) would quietly become 1.0
+        raise ValueError(f"'{field}' must be a number.")
+    try:
+        amount = float(value)
+    except OverflowError: # e.g. an integer like 10**400
+        raise ValueError(f"'{field}' must be a finite number.")
+    if not math.isfinite(amount): # float() also accepts 'nan' and 'inf'
+        raise ValueError(f"'{field}' must be a finite number.")
+    return amount
+
+def _sync_quantity(data, field):
+    quantity = _sync_amount(data, field)
+    if not quantity.is_integer(): # int(2.7) would quietly become 2
+        raise ValueError(f"'{field}' must be a whole number.")
+    if not 0 < quantity <= SYNC_MAX_QUANTITY:
+        raise ValueError(f"'{field}' must be between 1 and {SYNC_MAX_QUANTITY}.")
+    return int(quantity)
+
+def _sync_text(data, field, max_length=None, required=False):
+    value = data.get(field)
+    if value is None or (required and value == ''):
+        if required:
+            raise ValueError(f"'{field}' cannot be empty.")
+        return None
+    if not isinstance(value, str): # A list or object would only fail at INSERT, taking the batch with it
+        raise ValueError(f"'{field}' must be a string.")
+    if max_length is not None and len(value) > max_length: # Matches the String(n) column
+        raise ValueError(f"'{field}' must be at most {max_length} characters.")
+    return value
+
+def _sync_flag(data, field):
+    value = data.get(field, False)
+    if not isinstance(value, bool): # bool('false') is True
+        raise ValueError(f"'{field}' must be true or false.")
+    return value
+
+def _parse_sync_data(operation_type, data):
+    # Mirrors the validation done by the submit_daily_report, add_attendance and request_ingredients forms
+    if operation_type == 'daily_report':
+        return {
+            'report_date': datetime.strptime(data['report_date'], '%Y-%m-%d').date(),
+            'total_sales': _sync_amount(data, 'total_sales'),
+            'cash_collected': _sync_amount(data, 'cash_collected', 0.0),
+            'banked_in': _sync_amount(data, 'banked_in', 0.0),
+            'expenses': _sync_amount(data, 'expenses', 0.0),
+            'description': _sync_text(data, 'description'),
+        }
+    if operation_type == 'attendance':
+        return {
+            'report_date': datetime.strptime(data['report_date'], '%Y-%m-%d').date(),
+            'team_member_name': _sync_text(data, 'team_member_name', max_length=100, required=True),
+            'is_present': _sync_flag(data, 'is_present'),
+            'remarks': _sync_text(data, 'remarks'),
+        }
+    if operation_type == 'reorder':
+        ingredient_name = _sync_text(data, 'ingredient_name', max_length=100, required=True)
+        quantity_needed = _sync_quantity(data, 'quantity_needed')
+        request_date = data.get('request_date')
+        return {
+            'ingredient_name': ingredient_name,
+            'quantity_needed': quantity_needed,
+            'request_date': datetime.strptime(request_date, '%Y-%m-%d').date() if request_date else datetime.utcnow().date(),
+        }
+    raise ValueError(f"Unknown operation type '{operation_type}'.")
+
+def _apply_sync_batch(franchisee_id, operations):
+    results = [None] * len(operations)
+
+    # One indexed lookup for every key in the batch instead of a query per operation
+    keys = [op.get('key') for op in operations if isinstance(op, dict) and isinstance(op.get('key'), str)]
+    applied = {
+        sync_op.idempotency_key: sync_op
+        for sync_op in SyncOperation.query.filter(
+            SyncOperation.franchisee_id == franchisee_id,
+            SyncOperation.idempotency_key.in_(keys)
+        ).all()
+    } if keys else {}
+
+    pending = {'daily_report': [], 'attendance': [], 'reorder': []} # type -> [(index, key, parsed data)]
+    first_index_for_key = {} # Repeated keys within this batch point back at their first operation
+    repeated = []
+
+    for index, op in enumerate(operations):
+        key = op.get('key') if isinstance(op, dict) else None
+        if not isinstance(key, str) or not 0 < len(key) <= SYNC_KEY_MAX_LENGTH:
+            results[index] = {'key': key, 'status': 'error',
+                              'message': f'Each operation needs a string key of 1 to {SYNC_KEY_MAX_LENGTH} characters.'}
+            continue
+        if key in applied:
+            results[index] = {'key': key, 'status': 'duplicate',
+                              'type': applied[key].operation_type, 'id': applied[key].result_id}
+            continue
+        if key in first_index_for_key:
+            repeated.append((index, first_index_for_key[key]))
+            continue
+
+        operation_type = op.get('type')
+        data = op.get('data') or {}
+        if not isinstance(data, dict):
+            results[index] = {'key': key, 'status': 'error', 'type': operation_type, 'message': "'data' must be an object."}
+            continue
+        try:
+            data = _parse_sync_data(operation_type, data)
+        except KeyError as e:
+            results[index] = {'key': key, 'status': 'error', 'type': operation_type, 'message': f'Missing field {e}.'}
+            continue
+        except (TypeError, ValueError) as e:
+            results[index] = {'key': key, 'status': 'error', 'type': operation_type, 'message': str(e)}
+            continue
+        first_index_for_key[key] = index
+        pending[operation_type].append((index, key, data))
+
+    # Attendance rows attach to the booth's report for the same date, which may be in this batch
+    report_dates = {data['report_date'] for _, _, data in pending['daily_report'] + pending['attendance']}
+    reports_by_date = {
+        report.report_date: report
+        for report in DailyReport.query.filter(
+            DailyReport.franchisee_id == franchisee_id,
+            DailyReport.report_date.in_(report_dates)
+        ).all()
+    } if report_dates else {}
+
+    created = [] # (index, key, type, model instance)
+    conflicts = [] # (index, key, existing report)
+    closed = closed_months() if pending['daily_report'] else set()
+    for index, key, data in pending['daily_report']:
+        existing_report = reports_by_date.get(data['report_date'])
+        if existing_report:
+            conflicts.append((index, key, existing_report)) # Could be from this batch, so no id until the flush
+            continue
+        if (data['report_date'].year, data['report_date'].month) in closed:
+            results[index] = {'key': key, 'status': 'error', 'type': 'daily_report',
+                              'message': f"{data['report_date'].strftime('%B %Y')} has been closed. Please contact an admin."}
+            continue
+        new_report = DailyReport(franchisee_id=franchisee_id, notes=data['description'], **data)
+        reports_by_date[data['report_date']] = new_report
+        created.append((index, key, 'daily_report', new_report))
+
+    for index, key, data in pending['attendance']:
+        report_to_link = reports_by_date.get(data['report_date'])
+        if not report_to_link:
+            results[index] = {'key': key, 'status': 'error', 'type': 'attendance',
+                              'message': f"No daily report for {data['report_date']}. Sync the report first."}
+            continue
+        new_attendance = TeamAttendance(
+            daily_report=report_to_link,
+            franchisee_id=franchisee_id,
+            attendance_date=data['report_date'],
+            team_member_name=data['team_member_name'],
+            is_present=data['is_present'],
+            remarks=data['remarks']
+        )
+        created.append((index, key, 'attendance', new_attendance))
+
+    for index, key, data in pending['reorder']:
+        new_reorder = IngredientReorder(franchisee_id=franchisee_id, status='Pending', **data)
+        created.append((index, key, 'reorder', new_reorder))
+
+    # Flush once so every INSERT goes out batched per table and the new ids are available
+    db.session.add_all([instance for _, _, _, instance in created])
+    db.session.flush()
+    db.session.add_all([
+        SyncOperation(franchisee_id=franchisee_id, idempotency_key=key,
+                      operation_type=operation_type, result_id=instance.id)
+        for _, key, operation_type, instance in created
+    ])
+    db.session.commit()
+
+    for index, key, operation_type, instance in created:
+        results[index] = {'key': key, 'status': 'created', 'type': operation_type, 'id': instance.id}
+    for index, key, existing_report in conflicts:
+        results[index] = {'key': key, 'status': 'conflict', 'type': 'daily_report', 'id': existing_report.id,
+                          'message': f'A daily report for {existing_report.report_date} already exists.'}
+    for index, first_index in repeated:
+        first = results[first_index]
+        if first['status'] == 'created':
+            results[index] = dict(first, status='duplicate')
+        else:
+            results[index] = dict(first)
+    return results
+
+@app.route('/api/sync', methods=['POST'])
+@login_required
+def sync_batch():
+    payload = request.get_json(silent=True) or {}
+    operations = payload.get('operations') if isinstance(payload, dict) else None
+    if not isinstance(operations, list):
+        return jsonify({'error': "Expected a JSON body with an 'operations' list."}), 400
+    if len(operations) > app.config['SYNC_MAX_BATCH']:
+        return jsonify({'error': f"At most {app.config['SYNC_MAX_BATCH']} operations per sync."}), 413
+
+    try:
+        results = _apply_sync_batch(current_user.id, operations)
+    except IntegrityError:
+        # Another sync from the same booth committed some of these keys first.
+        # Replaying the batch reports those as duplicates and applies the rest.
+        db.session.rollback()
+        try:
+            results = _apply_sync_batch(current_user.id, operations)
+        except Exception:
+            return _sync_failed()
+    except Exception:
+        return _sync_failed()
+    return jsonify({'results': results})
+
+def _sync_failed():
+    # Keep database details (SQL, bound values) in the server log, not in the booth's response
+    db.session.rollback()
+    current_app.logger.exception(f'Sync failed for franchisee {current_user.id}.')
+    return jsonify({'error': 'The sync could not be applied. Nothing was saved; please retry later.'}), 500
+
 # --- Admin Dashboard and Functionality ---
 @app.route('/admin_dashboard')
 @login_required
@@ -365,6 +719,8 @@ def admin_dashboard():
     # Fetch all team attendances
     all_attendances = TeamAttendance.query.order_by(TeamAttendance.attendance_date.desc()).all()
 
+    # Closed months only need their headline columns here, not the full snapshot
+    month_closes = MonthClose.query.options(defer(MonthClose.snapshot)).order_by(MonthClose.year.desc(), MonthClose.month.desc()).all()
 
     return render_template(
         'admin_dashboard.html',
@@ -372,7 +728,8 @@ def admin_dashboard():
         franchisees=franchisees,
         all_daily_reports=all_daily_reports,
         all_reorders=all_reorders,
-        all_attendances=all_attendances
+        all_attendances=all_attendances,
+        month_closes=month_closes
     )
 
 @app.route('/admin/manage_franchisees')
@@ -408,7 +765,11 @@ def add_franchisee():
             return redirect(url_for('add_franchisee'))
 
         new_franchisee = Franchisee(username=username, name=name, location=location, is_admin=is_admin)
-        new_franchisee.set_password(password)
+        try:
+            new_franchisee.set_password(password)
+        except PasswordHashBusy:
+            flash('The server is busy right now. Please try again in a moment.', 'warning')
+            return redirect(url_for('add_franchisee'))
         db.session.add(new_franchisee)
         db.session.commit()
         flash('Franchisee added successfully!', 'success')
@@ -431,7 +792,12 @@ def edit_franchisee(id):
         franchisee.is_admin = 'is_admin' in request.form
         new_password = request.form.get('password')
         if new_password:
-            franchisee.set_password(new_password)
+            try:
+                franchisee.set_password(new_password)
+            except PasswordHashBusy:
+                db.session.rollback() # Discard the other field changes too
+                flash('The server is busy right now. Please try again in a moment.', 'warning')
+                return redirect(url_for('edit_franchisee', id=id))
         db.session.commit()
         flash('Franchisee updated successfully!', 'success')
         return redirect(url_for('manage_franchisees'))
@@ -444,6 +810,11 @@ def delete_franchisee(id):
         flash('Unauthorized access.', 'danger')
         return redirect(url_for('home'))
     franchisee = Franchisee.query.get_or_404(id)
+    # Deleting a franchisee deletes their reports too, which would change any closed month they appear in
+    for month_start in sorted({report.report_date.replace(day=1) for report in franchisee.daily_reports}):
+        if is_month_closed(month_start):
+            flash(f'{franchisee.name} has reports in {month_start.strftime("%B %Y")}, which is closed. Reopen it before deleting this franchisee.', 'danger')
+            return redirect(url_for('manage_franchisees'))
     db.session.delete(franchisee)
     db.session.commit()
     flash('Franchisee deleted successfully!', 'success')
@@ -467,7 +838,12 @@ def edit_daily_report(id):
 
     report = DailyReport.query.get_or_404(id)
     if request.method == 'POST':
-        report.report_date = datetime.strptime(request.form.get('report_date'), '%Y-%m-%d').date()
+        new_report_date = datetime.strptime(request.form.get('report_date'), '%Y-%m-%d').date()
+        for day in {report.report_date, new_report_date}:
+            if is_month_closed(day):
+                flash(f'{day.strftime("%B %Y")} is closed. Reopen it before editing its reports.', 'danger')
+                return redirect(url_for('admin_daily_reports'))
+        report.report_date = new_report_date
         report.total_sales = float(request.form.get('total_sales'))
         report.cash_collected = float(request.form.get('cash_collected'))
         report.banked_in = float(request.form.get('banked_in'))
@@ -486,6 +862,9 @@ def delete_daily_report(id):
         flash('Unauthorized access.', 'danger')
         return redirect(url_for('home'))
     report = DailyReport.query.get_or_404(id)
+    if is_month_closed(report.report_date):
+        flash(f'{report.report_date.strftime("%B %Y")} is closed. Reopen it before deleting its reports.', 'danger')
+        return redirect(url_for('admin_daily_reports'))
     db.session.delete(report)
     db.session.commit()
     flash('Daily report deleted successfully!', 'success')
@@ -567,6 +946,165 @@ def delete_attendance(id):
     flash('Attendance record deleted successfully!', 'success')
     return redirect(url_for('admin_team_attendances'))
 
+# --- Month Close (frozen monthly snapshots) ---
+# Closing a month freezes its per-franchisee totals and report list into a
+# MonthClose row. Monthly reporting for a closed month reads that row instead
+# of regrouping every DailyReport, and its reports can't be changed until an
+# admin explicitly reopens the month.
+
+def get_month_close(year, month):
+    return MonthClose.query.filter_by(year=year, month=month).first()
+
+def is_month_closed(day):
+    return get_month_close(day.year, day.month) is not None
+
+def closed_months():
+    return {(year, month) for year, month in db.session.query(MonthClose.year, MonthClose.month).all()}
+
+def build_month_snapshot(year, month):
+    start_date = datetime(year, month, 1).date()
+    end_date = datetime(year, month, monthrange(year, month)[1]).date()
+    monthly_reports = DailyReport.query.options(joinedload(DailyReport.franchisee)).filter(
+        DailyReport.report_date >= start_date,
+        DailyReport.report_date <= end_date
+    ).order_by(DailyReport.report_date.asc()).all()
+
+    def empty_totals():
+        return {'report_count': 0, 'total_sales': 0.0, 'cash_collected': 0.0, 'banked_in': 0.0, 'expenses': 0.0}
+
+    def add_report(totals, report):
+        totals['report_count'] += 1
+        totals['total_sales'] += report.total_sales
+        totals['cash_collected'] += report.cash_collected
+        totals['banked_in'] += report.banked_in
+        totals['expenses'] += report.expenses
+
+    def finish(totals):
+        totals['cash_discrepancy'] = totals['cash_collected'] - totals['banked_in']
+        for field in ('total_sales', 'cash_collected', 'banked_in', 'expenses', 'cash_discrepancy'):
+            totals[field] = round(totals[field], 2)
+        return totals
+
+    month_totals = empty_totals()
+    franchisees = {} # franchisee_id -> entry, in order of first report like the live monthly report
+    for report in monthly_reports:
+        entry = franchisees.get(report.franchisee_id)
+        if entry is None:
+            entry = franchisees[report.franchisee_id] = {
+                'franchisee_id': report.franchisee_id,
+                'name': report.franchisee.name if report.franchisee else "Unknown",
+                'location': report.franchisee.location if report.franchisee else None,
+                'totals': empty_totals(),
+                'reports': [],
+            }
+        add_report(entry['totals'], report)
+        add_report(month_totals, report)
+        entry['reports'].append({
+            'id': report.id,
+            'report_date': report.report_date.strftime('%Y-%m-%d'),
+            'total_sales': report.total_sales,
+            'cash_collected': report.cash_collected,
+            'banked_in': report.banked_in,
+            'expenses': report.expenses,
+            'notes': report.notes,
+        })
+
+    for entry in franchisees.values():
+        finish(entry['totals'])
+    return {
+        'year': year,
+        'month': month,
+        'month_name': start_date.strftime('%B'),
+        'closed': False,
+        'totals': finish(month_totals),
+        'franchisees': list(franchisees.values()),
+    }
+
+def snapshot_reports_by_franchisee(snapshot):
+    # Same shape the monthly report templates get from the live DailyReport query
+    reports_by_franchisee = {}
+    for entry in snapshot['franchisees']:
+        reports = reports_by_franchisee.setdefault(entry['name'], [])
+        for report in entry['reports']:
+            reports.append(SimpleNamespace(**dict(report, report_date=datetime.strptime(report['report_date'], '%Y-%m-%d').date())))
+    return reports_by_franchisee
+
+@app.route('/admin/close_month', methods=['POST'])
+@login_required
+def close_month():
+    if not current_user.is_admin:
+        flash('Unauthorized access.', 'danger')
+        return redirect(url_for('home'))
+
+    year = request.form.get('year', type=int)
+    month = request.form.get('month', type=int)
+    if not year or not month or not (1 <= month <= 12) or not 2000 <= year <= datetime.utcnow().year:
+        flash('Invalid month or year.', 'danger')
+        return redirect(url_for('admin_dashboard'))
+    if datetime(year, month, monthrange(year, month)[1]).date() >= datetime.utcnow().date():
+        flash('Only months that have already ended can be closed.', 'warning')
+        return redirect(url_for('admin_dashboard'))
+    if get_month_close(year, month):
+        flash(f'{year}-{month:02d} is already closed.', 'info')
+        return redirect(url_for('admin_dashboard'))
+
+    snapshot = build_month_snapshot(year, month)
+    closed_at = datetime.utcnow()
+    snapshot['closed'] = True
+    snapshot['closed_at'] = closed_at.strftime('%Y-%m-%d %H:%M:%S')
+    snapshot['closed_by'] = current_user.username
+    month_close = MonthClose(
+        year=year,
+        month=month,
+        closed_at=closed_at,
+        closed_by=current_user.username,
+        report_count=snapshot['totals']['report_count'],
+        total_sales=snapshot['totals']['total_sales'],
+        total_expenses=snapshot['totals']['expenses'],
+        cash_discrepancy=snapshot['totals']['cash_discrepancy'],
+        snapshot=json.dumps(snapshot, separators=(',', ':'))
+    )
+    try:
+        db.session.add(month_close)
+        db.session.commit()
+        flash(f'{snapshot["month_name"]} {year} closed with {month_close.report_count} reports.', 'success')
+    except IntegrityError:
+        db.session.rollback()
+        flash(f'{year}-{month:02d} is already closed.', 'info')
+    return redirect(url_for('admin_dashboard'))
+
+@app.route('/admin/reopen_month', methods=['POST'])
+@login_required
+def reopen_month():
+    if not current_user.is_admin:
+        flash('Unauthorized access.', 'danger')
+        return redirect(url_for('home'))
+
+    year = request.form.get('year', type=int)
+    month = request.form.get('month', type=int)
+    month_close = get_month_close(year, month)
+    if month_close is None:
+        flash('That month is not closed.', 'warning')
+        return redirect(url_for('admin_dashboard'))
+    db.session.delete(month_close)
+    db.session.commit()
+    flash(f'{year}-{month:02d} reopened. Close it again once your edits are done.', 'success')
+    return redirect(url_for('admin_dashboard'))
+
+@app.route('/admin/month_summary/<int:year>/<int:month>')
+@login_required
+def month_summary(year, month):
+    if not current_user.is_admin:
+        return jsonify({'error': 'Unauthorized access.'}), 403
+    if not (1 <= month <= 12) or not 2000 <= year <= MAXYEAR:
+        return jsonify({'error': 'Invalid month or year.'}), 400
+
+    month_close = get_month_close(year, month)
+    if month_close:
+        # Already serialised when the month was closed
+        return current_app.response_class(month_close.snapshot, mimetype='application/json')
+    return jsonify(build_month_snapshot(year, month))
+
 # --- PDF Generation Routes ---
 
 @app.route('/admin/daily_report_pdf/<int:report_id>')
@@ -580,27 +1118,19 @@ def daily_report_pdf(report_id):
     franchisee = Franchisee.query.get_or_404(report.franchisee_id)
     attendances = TeamAttendance.query.filter_by(daily_report_id=report_id).all()
 
-    # Render HTML template to a string
-    rendered_html = render_template('daily_report_pdf_template.html',
-                                    report=report,
-                                    franchisee=franchisee,
-                                    attendances=attendances,
-                                    current_date=datetime.now().strftime("%Y-%m-%d %H:%M"))
-
-    if config is None:
-        flash("PDF generation is not configured. wkhtmltopdf not found.", "danger")
+    if pdf_backend is None:
+        flash("PDF generation is not configured. Check the PDF_BACKEND setting and wkhtmltopdf install.", "danger")
         return redirect(url_for('admin_daily_reports'))
 
     try:
-        # Generate PDF from HTML string
-        pdf = pdfkit.from_string(rendered_html, False, configuration=config) # False means return PDF as string
-
-        response = make_response(pdf)
-        response.headers['Content-Type'] = 'application/pdf'
-        response.headers['Content-Disposition'] = f'attachment; filename=daily_report_{report.report_date}.pdf'
-        return response
+        pdf = pdf_backend.render_daily_report(report=report,
+                                              franchisee=franchisee,
+                                              attendances=attendances,
+                                              current_date=datetime.now().strftime("%Y-%m-%d %H:%M"))
+        return send_file(pdf, mimetype='application/pdf', as_attachment=True,
+                         download_name=f'daily_report_{report.report_date}.pdf')
     except Exception as e:
-        flash(f"Error generating PDF: {e}. Ensure wkhtmltopdf is correctly installed and configured.", "danger")
+        flash(f"Error generating PDF: {e}. Ensure the '{pdf_backend.name}' PDF backend is correctly installed and configured.", "danger")
         return redirect(url_for('admin_daily_reports'))
 
 
@@ -616,49 +1146,46 @@ def monthly_report_pdf():
     month = request.args.get('month', type=int, default=datetime.now().month)
 
     # Validate month and year
-    if not (1 <= month <= 12) or year < 2000: # Arbitrary sensible year start
+    if not (1 <= month <= 12) or not 2000 <= year <= MAXYEAR: # Arbitrary sensible year start
         flash('Invalid month or year.', 'danger')
         return redirect(url_for('admin_dashboard'))
 
-    # Calculate start and end dates for the month
-    start_date = datetime(year, month, 1).date()
-    end_date = datetime(year, month, monthrange(year, month)[1]).date()
-
-    # Fetch daily reports for the selected month across all franchisees
-    monthly_reports = DailyReport.query.filter(
-        DailyReport.report_date >= start_date,
-        DailyReport.report_date <= end_date
-    ).order_by(DailyReport.report_date.asc()).all()
-
-    # Group reports by franchisee for easier display
-    reports_by_franchisee = {}
-    for report in monthly_reports:
-        franchisee_name = report.franchisee.name if report.franchisee else "Unknown"
-        if franchisee_name not in reports_by_franchisee:
-            reports_by_franchisee[franchisee_name] = []
-        reports_by_franchisee[franchisee_name].append(report)
-
-    # Render HTML template to a string
-    rendered_html = render_template('monthly_report_pdf_template.html',
-                                    year=year,
-                                    month_name=datetime(year, month, 1).strftime('%B'),
-                                    reports_by_franchisee=reports_by_franchisee,
-                                    current_date=datetime.now().strftime("%Y-%m-%d %H:%M"))
-
-    if config is None:
-        flash("PDF generation is not configured. wkhtmltopdf not found.", "danger")
+    month_close = get_month_close(year, month)
+    if month_close:
+        # Closed month: rebuild the report list from the frozen snapshot, no DailyReport query
+        reports_by_franchisee = snapshot_reports_by_franchisee(json.loads(month_close.snapshot))
+    else:
+        reports_by_franchisee = {}
+        # Calculate start and end dates for the month
+        start_date = datetime(year, month, 1).date()
+        end_date = datetime(year, month, monthrange(year, month)[1]).date()
+
+        # Fetch daily reports for the selected month across all franchisees
+        monthly_reports = DailyReport.query.filter(
+            DailyReport.report_date >= start_date,
+            DailyReport.report_date <= end_date
+        ).order_by(DailyReport.report_date.asc()).all()
+
+        # Group reports by franchisee for easier display
+        for report in monthly_reports:
+            franchisee_name = report.franchisee.name if report.franchisee else "Unknown"
+            if franchisee_name not in reports_by_franchisee:
+                reports_by_franchisee[franchisee_name] = []
+            reports_by_franchisee[franchisee_name].append(report)
+
+    if pdf_backend is None:
+        flash("PDF generation is not configured. Check the PDF_BACKEND setting and wkhtmltopdf install.", "danger")
         return redirect(url_for('admin_dashboard'))
 
     try:
-        # Generate PDF from HTML string
-        pdf = pdfkit.from_string(rendered_html, False, configuration=config)
-
-        response = make_response(pdf)
-        response.headers['Content-Type'] = 'application/pdf'
-        response.headers['Content-Disposition'] = f'attachment; filename=monthly_report_{year}_{month:02d}.pdf'
-        return response
+        pdf = pdf_backend.render_monthly_report(year=year,
+                                                month_name=datetime(year, month, 1).strftime('%B'),
+                                                reports_by_franchisee=reports_by_franchisee,
+                                                current_date=datetime.now().strftime("%Y-%m-%d %H:%M"))
+        return send_file(pdf, mimetype='application/pdf', as_attachment=True,
+                         download_name=f'monthly_report_{year}_{month:02d}.pdf')
     except Exception as e:
-        flash(f"Error generating PDF: {e}. Ensure wkhtmltopdf is correctly installed and configured.", "danger")
+        flash(f"Error generating PDF: {e}. Ensure the '{pdf_backend.name}' PDF backend is correctly installed and configured.", "danger")
         return redirect(url_for('admin_dashboard'))
 
 # --- Database Initialization (Run once on app startup) ---
@@ -684,6 +1211,7 @@ with app.app_context():
         else:
             current_app.logger.info("Admin user 'admin' already exists.")
     else:
+        db.create_all() # Only creates tables added since the database was set up (e.g. sync_operation)
         current_app.logger.info("Database tables already exist.")
 
 
@@ -0,0 +1,131 @@
+# assets.py
+# Fingerprinted, pre-compressed static assets and on-the-fly HTML compression.
+#
+# At startup every file under the app's static folder is hashed and stored as
+# e.g. css/style.3f2a9c1b7d4e.css together with gzip (and brotli, if the Brotli
+# package from requirements.txt is installed) copies.
+# url_for('static', filename='css/style.css') in templates then points
+# at /assets/css/style.3f2a9c1b7d4e.css, which is served with a one-year
+# immutable Cache-Control: the name changes whenever the content does.
+import gzip
+import hashlib
+import mimetypes
+import os
+
+from flask import abort, current_app, request, url_for
+
+try:
+    import brotli
+except ImportError: # Optional: without it assets are only pre-compressed with gzip
+    brotli = None
+
+# Files smaller than this aren't worth compressing
+MIN_COMPRESS_SIZE = 512
+COMPRESSIBLE_MIMETYPES = {'text/html', 'text/css', 'text/plain', 'application/javascript',
+                          'text/javascript', 'application/json', 'image/svg+xml'}
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def _accepts(encoding):
+    return request.accept_encodings[encoding] > 0
+
+
+def _compress(data, encoding, quality):
+    if encoding == 'br':
+        return brotli.compress(data, quality=quality)
+    return gzip.compress(data, compresslevel=quality)
+
+
+class AssetPipeline:
+    def __init__(self, app=None):
+        self.manifest = {} # 'css/style.css' -> 'css/style.3f2a9c1b7d4e.css'
+        self._assets = {} # fingerprinted name -> (content hash, mimetype, {encoding: bytes})
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ASSETS_FINGERPRINT', True)
+        app.config.setdefault('COMPRESS_HTML', True)
+        app.config.setdefault('COMPRESS_LEVEL', 6) # gzip level for HTML compressed per response
+        app.config.setdefault('COMPRESS_BR_QUALITY', 5) # brotli quality for HTML compressed per response
+
+        if app.config['ASSETS_FINGERPRINT'] and app.static_folder:
+            self.build(app.static_folder)
+            app.add_url_rule('/assets/<path:filename>', 'assets', self.serve)
+            # Templates keep calling url_for('static', ...) and get the fingerprinted URL
+            app.jinja_env.globals['url_for'] = self.url_for
+        if app.config['COMPRESS_HTML']:
+            app.after_request(self.compress_response)
+
+    def build(self, static_folder):
+        for root, _, files in os.walk(static_folder):
+            for name in files:
+                path = os.path.join(root, name)
+                filename = os.path.relpath(path, static_folder).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    data = f.read()
+
+                stem, ext = os.path.splitext(filename)
+                digest = hashlib.sha256(data).hexdigest()[:12]
+                fingerprinted = f'{stem}.{digest}{ext}'
+                mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+                variants = {'identity': data}
+                if mimetype in COMPRESSIBLE_MIMETYPES and len(data) >= MIN_COMPRESS_SIZE:
+                    # Done once at startup, so use the slowest/smallest settings
+                    variants['gzip'] = _compress(data, 'gzip', 9)
+                    if brotli is not None:
+                        variants['br'] = _compress(data, 'br', 11)
+
+                self.manifest[filename] = fingerprinted
+                self._assets[fingerprinted] = (digest, mimetype, variants)
+
+    def url_for(self, endpoint, **values):
+        if endpoint == 'static' and values.get('filename') in self.manifest:
+            values['filename'] = self.manifest[values['filename']]
+            return url_for('assets', **values)
+        return url_for(endpoint, **values)
+
+    def serve(self, filename):
+        asset = self._assets.get(filename)
+        if asset is None:
+            abort(404)
+        digest, mimetype, variants = asset
+
+        encoding = next((e for e in ('br', 'gzip') if e in variants and _accepts(e)), 'identity')
+        # Each encoding is a different representation, so it needs its own strong validator
+        etag = f'{digest}-{encoding}'
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.response_class(variants[encoding], mimetype=mimetype)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        response.vary.add('Accept-Encoding')
+        return response
+
+    def compress_response(self, response):
+        if (response.mimetype not in ('text/html', 'application/json')
+                or response.status_code != 200
+                or response.direct_passthrough # Files from send_file, e.g. PDFs
+                or response.is_streamed
+                or 'Content-Encoding' in response.headers):
+            return response
+
+        # The body may differ by Accept-Encoding even when this one goes out uncompressed
+        response.vary.add('Accept-Encoding')
+        data = response.get_data()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return response
+        if brotli is not None and _accepts('br'):
+            encoding, quality = 'br', current_app.config['COMPRESS_BR_QUALITY']
+        elif _accepts('gzip'):
+            encoding, quality = 'gzip', current_app.config['COMPRESS_LEVEL']
+        else:
+            return response
+
+        response.set_data(_compress(data, encoding, quality))
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,64 @@
+# bench_login_throughput.py
+# Measures password checks (i.e. logins) per second for different PASSWORD_HASH_METHOD settings.
+#
+# Usage (from the repo root):
+#   python benchmarks/bench_login_throughput.py [--seconds 3] [--workers N] [METHOD ...]
+#
+# "per core" is a single thread checking passwords back to back. "pool" runs the
+# same checks on a thread pool of --workers threads, like the login worker pool in app.py.
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_METHODS = [
+    'pbkdf2:sha256:1000000', # werkzeug's default for 'pbkdf2:sha256'
+    'pbkdf2:sha256:600000',
+    'pbkdf2:sha256:260000',
+    'pbkdf2:sha256:100000',
+    'scrypt:32768:8:1', # werkzeug's default for 'scrypt'
+    'scrypt:16384:8:1',
+]
+PASSWORD = 'booth-password-123'
+
+
+def checks_per_second(password_hash, seconds, workers=1):
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+
+    def worker():
+        done = 0
+        while time.perf_counter() < deadline:
+            check_password_hash(password_hash, PASSWORD)
+            done += 1
+        return done
+
+    if workers == 1:
+        done = worker()
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            done = sum(pool.map(lambda _: worker(), range(workers)))
+    return done / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('methods', nargs='*', default=DEFAULT_METHODS)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    print(f"{args.seconds:g}s per setting, pool of {args.workers} workers on {os.cpu_count()} cores")
+    print(f"{'method':<24} {'ms/login':>9} {'per core/s':>11} {'pool/s':>8} {'pool/core/s':>12}")
+    cores_used = min(args.workers, os.cpu_count() or 1)
+    for method in args.methods:
+        password_hash = generate_password_hash(PASSWORD, method=method)
+        per_core = checks_per_second(password_hash, args.seconds)
+        pooled = checks_per_second(password_hash, args.seconds, workers=args.workers)
+        print(f"{method:<24} {1000 / per_core:>9.1f} {per_core:>11.1f} {pooled:>8.1f} {pooled / cores_used:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
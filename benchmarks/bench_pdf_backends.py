@@ -0,0 +1,104 @@
+# bench_pdf_backends.py
+# Compares the PDF backends on a 31-day, 200-booth monthly report.
+#
+# Usage (from the repo root):
+#   python benchmarks/bench_pdf_backends.py [--runs 5] [--pool-size 2]
+#
+# Uses synthetic in-memory rows, so no database is needed. Backends that can't
+# run on this machine (e.g. wkhtmltopdf not installed) are skipped.
+import argparse
+import os
+import random
+import sys
+import time
+from calendar import monthrange
+from datetime import date, datetime
+from types import SimpleNamespace
+
+from jinja2 import Environment, FileSystemLoader
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pdf_backends import PDF_BACKENDS, create_pdf_backend # noqa: E402
+
+YEAR, MONTH = 2025, 1
+BOOTHS = 200
+
+
+def build_month(year=YEAR, month=MONTH, booths=BOOTHS):
+    """Same shape as monthly_report_pdf's reports_by_franchisee."""
+    rng = random.Random(42)
+    reports_by_franchisee = {}
+    for booth in range(1, booths + 1):
+        reports = []
+        for day in range(1, monthrange(year, month)[1] + 1):
+            sales = round(rng.uniform(300, 2500), 2)
+            cash = round(sales * rng.uniform(0.3, 0.7), 2)
+            reports.append(SimpleNamespace(
+                report_date=date(year, month, day),
+                total_sales=sales,
+                cash_collected=cash,
+                banked_in=round(cash - rng.uniform(0, 20), 2),
+                expenses=round(rng.uniform(0, 150), 2),
+                notes=None,
+            ))
+        reports_by_franchisee[f'Booth {booth:03d}'] = reports
+    return reports_by_franchisee
+
+
+def find_wkhtmltopdf():
+    path = os.environ.get('WKHTMLTOPDF_PATH')
+    if path:
+        return path
+    for candidate in ('/usr/local/bin/wkhtmltopdf', '/usr/bin/wkhtmltopdf',
+                      'C:\\Program Files\\wkhtmltopdf\\bin\\wkhtmltopdf.exe'):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--pool-size', type=int, default=2)
+    args = parser.parse_args()
+
+    env = Environment(loader=FileSystemLoader(os.path.join(ROOT, 'templates')), autoescape=True)
+
+    def render_html(template_name, **context):
+        return env.get_template(template_name).render(**context)
+
+    reports_by_franchisee = build_month()
+    month_name = datetime(YEAR, MONTH, 1).strftime('%B')
+    wkhtmltopdf_path = find_wkhtmltopdf()
+    print(f"Monthly report: {len(reports_by_franchisee)} booths x {monthrange(YEAR, MONTH)[1]} days, {args.runs} runs each")
+    print(f"{'backend':<18} {'first (ms)':>11} {'mean (ms)':>10} {'min (ms)':>9} {'size (KB)':>10}")
+
+    for name in PDF_BACKENDS:
+        try:
+            backend = create_pdf_backend(name, wkhtmltopdf_path=wkhtmltopdf_path,
+                                         pool_size=args.pool_size, render_html=render_html)
+        except RuntimeError as e:
+            print(f"{name:<18} skipped: {e}")
+            continue
+
+        timings = []
+        size = 0
+        try:
+            for _ in range(args.runs + 1): # The first run includes process start-up / warm-up
+                start = time.perf_counter()
+                pdf = backend.render_monthly_report(year=YEAR, month_name=month_name,
+                                                    reports_by_franchisee=reports_by_franchisee,
+                                                    current_date=datetime.now().strftime("%Y-%m-%d %H:%M"))
+                size = len(pdf.read())
+                timings.append((time.perf_counter() - start) * 1000)
+        finally:
+            backend.close()
+
+        steady = timings[1:] or timings
+        print(f"{name:<18} {timings[0]:>11.1f} {sum(steady) / len(steady):>10.1f} {min(steady):>9.1f} {size / 1024:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
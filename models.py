@@ -1,8 +1,7 @@
 # models.py
 # models.py
-from app import db # Assuming your db object is in app.py
+from app import db, hash_password, verify_password # Assuming your db object is in app.py
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash # For password hashing
 import datetime # Import for Date and Time types
 
 class Franchisee(db.Model, UserMixin):
@@ -26,10 +25,10 @@ class Franchisee(db.Model, UserMixin):
         return str(self.id)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password) # Same PASSWORD_HASH_METHOD as app.Franchisee
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
 
 class DailyReport(db.Model):
     id = db.Column(db.Integer, primary_key=True)
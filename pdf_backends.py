@@ -0,0 +1,319 @@
+# pdf_backends.py
+# Pluggable PDF rendering for the daily and monthly report downloads.
+# Pick one with the PDF_BACKEND setting in app.py:
+#   'wkhtmltopdf'      - one wkhtmltopdf process per PDF via pdfkit (original behaviour)
+#   'wkhtmltopdf_pool' - a warm pool of long-lived wkhtmltopdf processes
+#   'reportlab'        - pure-Python rendering straight from the query results
+#                        (needs reportlab, listed in requirements.txt)
+import io
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import atexit
+from xml.sax.saxutils import escape # Paragraph text is parsed as markup
+
+import pdfkit
+
+try:
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import mm
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+except ImportError: # ReportLab is only needed for the 'reportlab' backend
+    SimpleDocTemplate = None
+
+DAILY_TEMPLATE = 'daily_report_pdf_template.html'
+MONTHLY_TEMPLATE = 'monthly_report_pdf_template.html'
+
+# Spool PDFs in memory up to this size before falling back to a temp file
+SPOOL_MAX_SIZE = 4 * 1024 * 1024
+
+
+class PDFBackend:
+    """Base class. Each render method returns a binary file object positioned at 0."""
+    name = None
+
+    def render_daily_report(self, report, franchisee, attendances, current_date):
+        raise NotImplementedError
+
+    def render_monthly_report(self, year, month_name, reports_by_franchisee, current_date):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class _HTMLBackend(PDFBackend):
+    """Renders the Jinja PDF templates to HTML and hands that to wkhtmltopdf."""
+
+    def __init__(self, render_html=None):
+        if render_html is None:
+            from flask import render_template as render_html # Needs an app context
+        self._render_html = render_html
+
+    def render_daily_report(self, report, franchisee, attendances, current_date):
+        html = self._render_html(DAILY_TEMPLATE, report=report, franchisee=franchisee,
+                                 attendances=attendances, current_date=current_date)
+        return io.BytesIO(self._to_pdf(html))
+
+    def render_monthly_report(self, year, month_name, reports_by_franchisee, current_date):
+        html = self._render_html(MONTHLY_TEMPLATE, year=year, month_name=month_name,
+                                 reports_by_franchisee=reports_by_franchisee,
+                                 current_date=current_date)
+        return io.BytesIO(self._to_pdf(html))
+
+    def _to_pdf(self, html):
+        raise NotImplementedError
+
+
+# --- wkhtmltopdf, one process per PDF ---
+class PdfkitBackend(_HTMLBackend):
+    name = 'wkhtmltopdf'
+
+    def __init__(self, wkhtmltopdf_path, render_html=None):
+        super().__init__(render_html)
+        self._config = pdfkit.configuration(wkhtmltopdf=wkhtmltopdf_path)
+
+    def _to_pdf(self, html):
+        return pdfkit.from_string(html, False, configuration=self._config) # False means return PDF as bytes
+
+
+# --- wkhtmltopdf, warm process pool ---
+class _WkhtmltopdfWorker:
+    """One long-lived wkhtmltopdf started with --read-args-from-stdin.
+
+    Each line written to stdin is one conversion. Without --quiet, wkhtmltopdf
+    prints 'Done' on stderr when a conversion finishes, which is how we know
+    the output file is complete. A background thread reads stderr so a hung
+    conversion can be timed out; on any failure the process is killed and a
+    fresh one is started for the next job.
+    """
+
+    def __init__(self, wkhtmltopdf_path, timeout=60):
+        self._path = wkhtmltopdf_path
+        self._timeout = timeout
+        self._workdir = tempfile.mkdtemp(prefix='sakecha-pdf-')
+        self._in_path = os.path.join(self._workdir, 'in.html')
+        self._out_path = os.path.join(self._workdir, 'out.pdf')
+        self._process = None
+        self._lines = None
+
+    def start(self):
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen(
+                [self._path, '--read-args-from-stdin'],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                text=True,
+                encoding='utf-8',
+                errors='replace',
+                bufsize=1,
+            )
+            self._lines = queue.Queue()
+            threading.Thread(target=self._read_stderr, args=(self._process.stderr, self._lines),
+                             daemon=True).start()
+
+    @staticmethod
+    def _read_stderr(stream, lines):
+        for line in stream:
+            lines.put(line)
+        lines.put(None) # EOF: the process exited
+
+    def _next_status(self, deadline):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise RuntimeError(f'wkhtmltopdf timed out after {self._timeout}s')
+        try:
+            line = self._lines.get(timeout=remaining)
+        except queue.Empty:
+            raise RuntimeError(f'wkhtmltopdf timed out after {self._timeout}s')
+        if line is None:
+            raise RuntimeError('wkhtmltopdf worker exited unexpectedly')
+        # Progress bars are redrawn with '\r', so only the last segment counts
+        return line.rstrip('\n').split('\r')[-1].strip()
+
+    def render(self, html):
+        self.start() # No-op unless the previous process died
+        try:
+            with open(self._in_path, 'w', encoding='utf-8') as f:
+                f.write(html)
+            if os.path.exists(self._out_path):
+                os.remove(self._out_path)
+
+            self._process.stdin.write(f'--encoding utf-8 "{self._in_path}" "{self._out_path}"\n')
+            self._process.stdin.flush()
+
+            deadline = time.monotonic() + self._timeout
+            while True:
+                status = self._next_status(deadline)
+                if status == 'Done':
+                    break
+                if status.startswith('Exit with code') and not os.path.exists(self._out_path):
+                    raise RuntimeError(f'wkhtmltopdf failed: {status}')
+                # Otherwise (e.g. a missing image) the PDF is still written; wait for its 'Done'
+
+            with open(self._out_path, 'rb') as f:
+                return f.read()
+        except Exception:
+            # The process may still be working on this job; don't let it answer the next one
+            self._kill()
+            raise
+
+    def _kill(self):
+        if self._process is not None and self._process.poll() is None:
+            self._process.kill()
+            self._process.wait()
+        self._process = None
+
+    def close(self):
+        if self._process is not None and self._process.poll() is None:
+            self._process.stdin.close()
+            try:
+                self._process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._kill()
+        self._process = None
+        shutil.rmtree(self._workdir, ignore_errors=True)
+
+
+class WkhtmltopdfPoolBackend(_HTMLBackend):
+    name = 'wkhtmltopdf_pool'
+
+    def __init__(self, wkhtmltopdf_path, size=2, render_html=None, timeout=60):
+        super().__init__(render_html)
+        self._workers = [_WkhtmltopdfWorker(wkhtmltopdf_path, timeout=timeout) for _ in range(max(1, size))]
+        self._idle = queue.Queue()
+        for worker in self._workers:
+            worker.start() # Pay the start-up cost now, not on the first request
+            self._idle.put(worker)
+        atexit.register(self.close)
+
+    def _to_pdf(self, html):
+        worker = self._idle.get() # Blocks until a worker is free
+        try:
+            return worker.render(html)
+        finally:
+            self._idle.put(worker)
+
+    def close(self):
+        for worker in self._workers:
+            worker.close()
+
+
+# --- ReportLab, no external process ---
+class ReportLabBackend(PDFBackend):
+    name = 'reportlab'
+
+    def __init__(self):
+        if SimpleDocTemplate is None:
+            raise RuntimeError("ReportLab is not installed. Run 'pip install reportlab' to use the 'reportlab' PDF backend")
+        self._styles = getSampleStyleSheet()
+        # Shared base style; each table extends it with its own column alignment
+        self._table_style = TableStyle([
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#dddddd')),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f2f2f2')),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ])
+
+    def _build(self, title, flowables):
+        output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        doc = SimpleDocTemplate(output, pagesize=A4, title=title,
+                                leftMargin=15 * mm, rightMargin=15 * mm,
+                                topMargin=15 * mm, bottomMargin=15 * mm)
+        doc.build(flowables)
+        output.seek(0)
+        return output
+
+    def _table(self, rows, money_columns=()):
+        table = Table(rows, repeatRows=1)
+        style = TableStyle(parent=self._table_style)
+        for column in money_columns:
+            style.add('ALIGN', (column, 1), (column, -1), 'RIGHT')
+        table.setStyle(style)
+        return table
+
+    def render_daily_report(self, report, franchisee, attendances, current_date):
+        styles = self._styles
+        story = [
+            Paragraph('Daily Sales Report', styles['Title']),
+            Paragraph(escape(f'{franchisee.name} - {franchisee.location}'), styles['Heading2']),
+            Paragraph(f'Report date: {report.report_date.strftime("%Y-%m-%d")}', styles['Normal']),
+            Paragraph(f'Generated: {current_date}', styles['Normal']),
+            Spacer(1, 6 * mm),
+            self._table([
+                ['Total Sales (RM)', 'Cash Collected (RM)', 'Banked In (RM)', 'Expenses (RM)'],
+                [f'{report.total_sales:.2f}', f'{report.cash_collected:.2f}',
+                 f'{report.banked_in:.2f}', f'{report.expenses:.2f}'],
+            ], money_columns=(0, 1, 2, 3)),
+            Spacer(1, 4 * mm),
+            Paragraph(escape(f'Notes: {report.notes or "N/A"}'), styles['Normal']),
+            Spacer(1, 6 * mm),
+            Paragraph('Team Attendance', styles['Heading2']),
+        ]
+        rows = [['Team Member', 'Present', 'Remarks']]
+        for attendance in attendances:
+            rows.append([attendance.team_member_name,
+                         'Yes' if attendance.is_present else 'No',
+                         attendance.remarks or ''])
+        story.append(self._table(rows))
+        return self._build(f'Daily Report {report.report_date}', story)
+
+    def render_monthly_report(self, year, month_name, reports_by_franchisee, current_date):
+        styles = self._styles
+        story = [
+            Paragraph('Monthly Report', styles['Title']),
+            Paragraph(f'For {month_name} {year}', styles['Heading2']),
+            Paragraph(f'Generated: {current_date}', styles['Normal']),
+            Spacer(1, 6 * mm),
+        ]
+        month_sales = 0.0
+        for franchisee_name, reports in reports_by_franchisee.items():
+            rows = [['Date', 'Total Sales (RM)', 'Cash Collected (RM)', 'Banked In (RM)', 'Expenses (RM)']]
+            sales = cash = banked = expenses = 0.0
+            for report in reports:
+                rows.append([report.report_date.strftime('%Y-%m-%d'),
+                             f'{report.total_sales:.2f}', f'{report.cash_collected:.2f}',
+                             f'{report.banked_in:.2f}', f'{report.expenses:.2f}'])
+                sales += report.total_sales
+                cash += report.cash_collected
+                banked += report.banked_in
+                expenses += report.expenses
+            rows.append(['Total', f'{sales:.2f}', f'{cash:.2f}', f'{banked:.2f}', f'{expenses:.2f}'])
+            month_sales += sales
+
+            story.append(Paragraph(escape(franchisee_name), styles['Heading3']))
+            story.append(self._table(rows, money_columns=(1, 2, 3, 4)))
+            story.append(Spacer(1, 4 * mm))
+
+        story.append(Paragraph(f'Total Sales for the Month: RM {month_sales:.2f}', styles['Heading2']))
+        return self._build(f'Monthly Report {month_name} {year}', story)
+
+
+PDF_BACKENDS = {
+    PdfkitBackend.name: PdfkitBackend,
+    WkhtmltopdfPoolBackend.name: WkhtmltopdfPoolBackend,
+    ReportLabBackend.name: ReportLabBackend,
+}
+
+
+def create_pdf_backend(name, wkhtmltopdf_path=None, pool_size=2, render_html=None, render_timeout=60):
+    """Build the backend named by the PDF_BACKEND setting. Raises RuntimeError if it can't run here."""
+    if name not in PDF_BACKENDS:
+        raise RuntimeError(f"Unknown PDF backend '{name}'. Choose one of: {', '.join(PDF_BACKENDS)}")
+    if name == ReportLabBackend.name:
+        return ReportLabBackend()
+
+    if not wkhtmltopdf_path or not os.path.exists(wkhtmltopdf_path):
+        raise RuntimeError(f"wkhtmltopdf not found at '{wkhtmltopdf_path}'")
+    if name == WkhtmltopdfPoolBackend.name:
+        return WkhtmltopdfPoolBackend(wkhtmltopdf_path, size=pool_size, render_html=render_html,
+                                      timeout=render_timeout)
+    return PdfkitBackend(wkhtmltopdf_path, render_html=render_html)
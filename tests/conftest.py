@@ -0,0 +1,34 @@
+# conftest.py
+# app.py configures itself from the environment and creates its tables on import,
+# so point it at a throwaway SQLite database before anything imports it.
+import os
+import sys
+import tempfile
+
+_db_dir = tempfile.mkdtemp(prefix='sakecha-test-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_db_dir, 'test.db')
+os.environ.setdefault('ADMIN_PASSWORD', 'test-admin-password')
+os.environ.setdefault('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000') # Keep logins fast in tests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from app import app as flask_app, db, DailyReport, TeamAttendance, IngredientReorder, SyncOperation, MonthClose
+
+
+@pytest.fixture
+def app():
+    flask_app.config['TESTING'] = True
+    yield flask_app
+    with flask_app.app_context():
+        for model in (TeamAttendance, DailyReport, IngredientReorder, SyncOperation, MonthClose):
+            model.query.delete()
+        db.session.commit()
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': os.environ['ADMIN_PASSWORD']})
+    return client
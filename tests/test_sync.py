@@ -0,0 +1,122 @@
+# test_sync.py
+# /api/sync: one check per result status, plus the IntegrityError retry.
+from sqlalchemy.exc import IntegrityError
+
+import app as app_module
+from app import DailyReport, TeamAttendance, IngredientReorder, SyncOperation
+
+
+def sync(client, *operations):
+    response = client.post('/api/sync', json={'operations': list(operations)})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()['results']
+
+
+def report_op(key, report_date='2025-02-01', **data):
+    return {'key': key, 'type': 'daily_report',
+            'data': {'report_date': report_date, 'total_sales': 100, **data}}
+
+
+def reorder_op(key, **data):
+    return {'key': key, 'type': 'reorder',
+            'data': {'ingredient_name': 'Matcha', 'quantity_needed': 2, **data}}
+
+
+def test_created(client, app):
+    results = sync(client, report_op('r1'), reorder_op('o1'))
+    assert [r['status'] for r in results] == ['created', 'created']
+    with app.app_context():
+        assert DailyReport.query.get(results[0]['id']).total_sales == 100
+        assert IngredientReorder.query.get(results[1]['id']).quantity_needed == 2
+        assert SyncOperation.query.count() == 2
+
+
+def test_attendance_links_to_report_in_same_batch(client, app):
+    attendance = {'key': 'a1', 'type': 'attendance',
+                  'data': {'report_date': '2025-02-01', 'team_member_name': 'Ali', 'is_present': True}}
+    report, attendance = sync(client, report_op('r1'), attendance)
+    assert attendance['status'] == 'created'
+    with app.app_context():
+        assert TeamAttendance.query.get(attendance['id']).daily_report_id == report['id']
+
+
+def test_duplicate_after_commit(client, app):
+    first = sync(client, reorder_op('o1'))[0]
+    replay = sync(client, reorder_op('o1'))[0]
+    assert replay == dict(first, status='duplicate')
+    with app.app_context():
+        assert IngredientReorder.query.count() == 1
+
+
+def test_duplicate_within_batch(client, app):
+    first, repeat = sync(client, reorder_op('o1'), reorder_op('o1'))
+    assert first['status'] == 'created'
+    assert repeat == dict(first, status='duplicate')
+    with app.app_context():
+        assert IngredientReorder.query.count() == 1
+
+
+def test_conflict_with_existing_report(client, app):
+    existing = sync(client, report_op('r1'))[0]
+    conflict = sync(client, report_op('r2'))[0]
+    assert conflict['status'] == 'conflict'
+    assert conflict['id'] == existing['id']
+    with app.app_context():
+        assert DailyReport.query.count() == 1
+        # Not applied, so the key isn't recorded and the booth can resend it later
+        assert SyncOperation.query.filter_by(idempotency_key='r2').count() == 0
+
+
+def test_errors_fail_only_their_own_operation(client, app):
+    bad = [
+        report_op('nan', total_sales='nan'),
+        report_op('desc', report_date='2025-02-02', description=['x']),
+        reorder_op('obj', ingredient_name={'a': 1}),
+        reorder_op('long', ingredient_name='x' * 101),
+        reorder_op('frac', quantity_needed=2.7),
+        reorder_op('huge', quantity_needed=10**30),
+        {'key': 'flag', 'type': 'attendance',
+         'data': {'report_date': '2025-02-01', 'team_member_name': 'Ali', 'is_present': 'false'}},
+        {'key': 'type', 'type': 'bogus', 'data': {}},
+        {'type': 'reorder', 'data': {}},
+    ]
+    results = sync(client, reorder_op('good'), *bad)
+    assert results[0]['status'] == 'created'
+    assert [r['status'] for r in results[1:]] == ['error'] * len(bad)
+    with app.app_context():
+        assert IngredientReorder.query.count() == 1
+        assert DailyReport.query.count() == 0
+
+
+def test_retry_after_concurrent_commit(client, app, monkeypatch):
+    real_apply = app_module._apply_sync_batch
+    calls = []
+
+    def racing_apply(franchisee_id, operations):
+        calls.append(operations)
+        if len(calls) == 1:
+            # Another sync commits the same keys first, so ours hits the unique constraint
+            real_apply(franchisee_id, operations)
+            raise IntegrityError('INSERT INTO sync_operation', {}, Exception('UNIQUE constraint failed'))
+        return real_apply(franchisee_id, operations)
+
+    monkeypatch.setattr(app_module, '_apply_sync_batch', racing_apply)
+    results = sync(client, reorder_op('o1'))
+    assert len(calls) == 2
+    assert results[0]['status'] == 'duplicate'
+    with app.app_context():
+        assert IngredientReorder.query.count() == 1
+
+
+def test_unexpected_failure_hides_details(client, monkeypatch):
+    def broken_apply(franchisee_id, operations):
+        raise RuntimeError('INSERT INTO ingredient_reorder VALUES (secret)')
+
+    monkeypatch.setattr(app_module, '_apply_sync_batch', broken_apply)
+    response = client.post('/api/sync', json={'operations': [reorder_op('o1')]})
+    assert response.status_code == 500
+    assert 'secret' not in response.get_data(as_text=True)
+
+
+def test_rejects_malformed_body(client):
+    assert client.post('/api/sync', json={'ops': []}).status_code == 400